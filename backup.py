@@ -30,6 +30,10 @@ ERROR_MESSAGES = {
     "CONFIG_VALUE_NOT_FOUND": "Required configuration '{}' not found in config file{}",
     "CONFIG_EXTRACTION_ERROR": "Error extracting configuration: {}",
     "SCHEDULER_ERROR": "Error in scheduler: {}",
+    "INVALID_LOG_LEVEL": "Invalid logging level: {}",
+    "INVALID_BACKUP_JOBS": "backup.jobs must be a positive integer, got: {}",
+    "INVALID_RETENTION": "retention.{} must be a non-negative integer, got: {}",
+    "CONFIG_RELOAD_FAILED": "Configuration reload failed, keeping previous configuration: {}",
 }
 
 # Inizializza l'parser degli argomenti
@@ -181,11 +185,12 @@ def expand_env_vars(config_str):
 
 
 # Carica e valida la configurazione
-try:
-    logger.debug(f"Permessi file: {oct(os.stat(args.config).st_mode)[-3:]}")
-    logger.debug(f"Proprietario: {os.stat(args.config).st_uid}")
+def load_config(config_path):
+    """Read the configuration file, merge it with the defaults and validate it."""
+    logger.debug(f"Permessi file: {oct(os.stat(config_path).st_mode)[-3:]}")
+    logger.debug(f"Proprietario: {os.stat(config_path).st_uid}")
 
-    with open(args.config, "rb") as f:
+    with open(config_path, "rb") as f:
         config_str = f.read().decode()
         # Espandi le variabili d'ambiente nel contenuto del file
         config_str = expand_env_vars(config_str)
@@ -211,20 +216,38 @@ try:
     if "devices" not in config or "routers" not in config["devices"]:
         raise ValueError(ERROR_MESSAGES["ROUTER_LIST_MISSING"])
 
-    # Validazione chiave SSH
-    try:
-        # Usa args.key se specificato, altrimenti usa il valore dal config
-        ssh_key_to_validate = args.key if args.key else config["ssh"]["key_path"]
-        logger.debug(f"Using SSH key path: {ssh_key_to_validate}")
-        validate_ssh_key(ssh_key_to_validate)
-    except FileNotFoundError as e:
-        logger.error(f"SSH key error: {str(e)}")
-        print(f"Error: SSH key not found: {ssh_key_to_validate}")
-        exit(1)
+    log_level = config["logging"]["level"]
+    if not isinstance(log_level, str) or not isinstance(
+        logging.getLevelName(log_level.upper()), int
+    ):
+        raise ValueError(ERROR_MESSAGES["INVALID_LOG_LEVEL"].format(log_level))
+
+    return config
+
+
+# Impronta del file di configurazione, usata in daemon mode per rilevare modifiche
+def get_config_signature(config_path):
+    # Kubernetes aggiorna i Secret montati sostituendo il symlink: os.stat lo segue,
+    # quindi cambiano inode e mtime del file puntato
+    stat = os.stat(config_path)
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
 
+
+try:
+    CONFIG_SIGNATURE = get_config_signature(args.config)
+    config = load_config(args.config)
+
+    # Validazione chiave SSH
+    # Usa args.key se specificato, altrimenti usa il valore dal config
+    ssh_key_to_validate = args.key if args.key else config["ssh"]["key_path"]
+    logger.debug(f"Using SSH key path: {ssh_key_to_validate}")
+    validate_ssh_key(ssh_key_to_validate)
 except FileNotFoundError as e:
     logger.error(f"FileNotFoundError dettagliato: {str(e)}")
-    print(f"Error: Configuration file not found: {args.config}")
+    if os.path.exists(args.config):
+        print(f"Error: {str(e)}")
+    else:
+        print(f"Error: Configuration file not found: {args.config}")
     exit(1)
 except Exception as e:
     logger.error(ERROR_MESSAGES["CONFIG_EXTRACTION_ERROR"].format(str(e)))
@@ -269,66 +292,216 @@ def get_config_value(config_dict, *keys, env_var=None, required=True, default=No
 
 
 # Estrai e valida le variabili di configurazione
-try:
+def extract_settings(config):
+    """Extract the runtime settings from a loaded configuration."""
+    settings = {}
+
     # SSH settings
-    SSH_USERNAME = get_config_value(config, "ssh", "username", env_var="MIKROTIK_SSH_USER")
-    SSH_KEY_PATH = args.key if args.key else get_config_value(config, "ssh", "key_path")
+    settings["SSH_USERNAME"] = get_config_value(
+        config, "ssh", "username", env_var="MIKROTIK_SSH_USER"
+    )
+    settings["SSH_KEY_PATH"] = args.key if args.key else get_config_value(config, "ssh", "key_path")
 
     # Storage settings
-    S3_TYPE = get_config_value(config, "storage", "type", env_var="MIKROTIK_S3_TYPE")
-    S3_BUCKET_NAME = get_config_value(config, "storage", "bucket", env_var="MIKROTIK_S3_BUCKET")
-    S3_ENDPOINT_URL = get_config_value(
+    settings["S3_TYPE"] = get_config_value(config, "storage", "type", env_var="MIKROTIK_S3_TYPE")
+    settings["S3_BUCKET_NAME"] = get_config_value(
+        config, "storage", "bucket", env_var="MIKROTIK_S3_BUCKET"
+    )
+    settings["S3_ENDPOINT_URL"] = get_config_value(
         config, "storage", "endpoint", env_var="MIKROTIK_S3_ENDPOINT"
     )
-    S3_ACCESS_KEY = get_config_value(
+    settings["S3_ACCESS_KEY"] = get_config_value(
         config, "storage", "access_key", env_var="MIKROTIK_S3_ACCESS_KEY"
     )
-    S3_SECRET_KEY = get_config_value(
+    settings["S3_SECRET_KEY"] = get_config_value(
         config, "storage", "secret_key", env_var="MIKROTIK_S3_SECRET_KEY"
     )
 
     # Backup settings
-    BACKUP_DIR = get_config_value(config, "backup", "local_dir", default="/tmp/mikrotik_backups")
-    os.makedirs(BACKUP_DIR, exist_ok=True)
+    settings["BACKUP_DIR"] = get_config_value(
+        config, "backup", "local_dir", default="/tmp/mikrotik_backups"
+    )
 
     # Device settings
-    ROUTER_IPS = get_config_value(config, "devices", "routers")
-    if not isinstance(ROUTER_IPS, list) or not ROUTER_IPS:
+    router_ips = get_config_value(config, "devices", "routers")
+    if not isinstance(router_ips, list) or not router_ips:
         raise ValueError(ERROR_MESSAGES["INVALID_ROUTER_LIST"])
+    settings["ROUTER_IPS"] = router_ips
 
     # Retention settings
-    RETENTION_DAILY = get_config_value(config, "retention", "daily", default=30)
-    RETENTION_MONTHLY = get_config_value(config, "retention", "monthly", default=12)
-    RETENTION_YEARLY = get_config_value(config, "retention", "yearly", default=5)
+    settings["RETENTION_DAILY"] = get_config_value(config, "retention", "daily", default=30)
+    settings["RETENTION_MONTHLY"] = get_config_value(config, "retention", "monthly", default=12)
+    settings["RETENTION_YEARLY"] = get_config_value(config, "retention", "yearly", default=5)
+    for period in ("daily", "monthly", "yearly"):
+        value = settings[f"RETENTION_{period.upper()}"]
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            raise ValueError(ERROR_MESSAGES["INVALID_RETENTION"].format(period, value))
 
     # Jobs setting
     if args.jobs:
-        BACKUP_JOBS = args.jobs
+        settings["BACKUP_JOBS"] = args.jobs
     else:
-        BACKUP_JOBS = get_config_value(
+        settings["BACKUP_JOBS"] = get_config_value(
             config, "backup", "jobs", default=multiprocessing.cpu_count() * 2
         )
-
+    jobs = settings["BACKUP_JOBS"]
+    if isinstance(jobs, bool) or not isinstance(jobs, int) or jobs < 1:
+        raise ValueError(ERROR_MESSAGES["INVALID_BACKUP_JOBS"].format(jobs))
+
+    return settings
+
+
+# Applica le impostazioni come variabili globali usate dalle funzioni di backup
+def apply_settings(settings):
+    global SETTINGS, SSH_USERNAME, SSH_KEY_PATH
+    global S3_TYPE, S3_BUCKET_NAME, S3_ENDPOINT_URL, S3_ACCESS_KEY, S3_SECRET_KEY
+    global BACKUP_DIR, ROUTER_IPS, BACKUP_JOBS
+    global RETENTION_DAILY, RETENTION_MONTHLY, RETENTION_YEARLY
+
+    # Unico effetto collaterale: se fallisce, le impostazioni correnti restano invariate
+    os.makedirs(settings["BACKUP_DIR"], exist_ok=True)
+
+    SETTINGS = settings
+    SSH_USERNAME = settings["SSH_USERNAME"]
+    SSH_KEY_PATH = settings["SSH_KEY_PATH"]
+    S3_TYPE = settings["S3_TYPE"]
+    S3_BUCKET_NAME = settings["S3_BUCKET_NAME"]
+    S3_ENDPOINT_URL = settings["S3_ENDPOINT_URL"]
+    S3_ACCESS_KEY = settings["S3_ACCESS_KEY"]
+    S3_SECRET_KEY = settings["S3_SECRET_KEY"]
+    BACKUP_DIR = settings["BACKUP_DIR"]
+    ROUTER_IPS = settings["ROUTER_IPS"]
+    BACKUP_JOBS = settings["BACKUP_JOBS"]
+    RETENTION_DAILY = settings["RETENTION_DAILY"]
+    RETENTION_MONTHLY = settings["RETENTION_MONTHLY"]
+    RETENTION_YEARLY = settings["RETENTION_YEARLY"]
+
+
+def log_settings():
     logger.info("Configuration loaded successfully:")
     logger.info(f"- Backup directory: {BACKUP_DIR}")
     logger.info(f"- Configured routers: {', '.join(ROUTER_IPS)}")
     logger.info(f"- Parallel jobs: {BACKUP_JOBS}")
     logger.info(f"- Retention policy: {RETENTION_DAILY}d/{RETENTION_MONTHLY}m/{RETENTION_YEARLY}y")
 
+
+def create_s3_client(settings):
+    return boto3.client(
+        "s3",
+        endpoint_url=settings["S3_ENDPOINT_URL"],
+        aws_access_key_id=settings["S3_ACCESS_KEY"],
+        aws_secret_access_key=settings["S3_SECRET_KEY"],
+    )
+
+
+try:
+    apply_settings(extract_settings(config))
+    log_settings()
 except Exception as e:
     logger.error(ERROR_MESSAGES["CONFIG_EXTRACTION_ERROR"].format(str(e)))
     sys.exit(1)
 
 # Inizializza il client S3
-s3 = boto3.client(
-    "s3",
-    endpoint_url=S3_ENDPOINT_URL,
-    aws_access_key_id=S3_ACCESS_KEY,
-    aws_secret_access_key=S3_SECRET_KEY,
-)
+s3 = create_s3_client(SETTINGS)
 logger.debug("Client S3 initialized")
 
 
+# Ricarica la configurazione in daemon mode se il file è cambiato
+def reload_config_if_changed():
+    """
+    Reload the configuration file if it changed since the last load.
+    The new configuration is fully validated before being swapped in; on error the
+    previous configuration stays active. Returns True if a new configuration was applied.
+    """
+    global config, CONFIG_SIGNATURE, s3
+
+    try:
+        signature = get_config_signature(args.config)
+    except OSError as e:
+        logger.warning(ERROR_MESSAGES["CONFIG_RELOAD_FAILED"].format(str(e)))
+        return False
+
+    if signature == CONFIG_SIGNATURE:
+        return False
+
+    logger.info(
+        f"{Fore.CYAN}🔄 Configuration file changed, reloading: {args.config}{Style.RESET_ALL}"
+    )
+    try:
+        new_config = load_config(args.config)
+        new_settings = extract_settings(new_config)
+    except ValueError as e:
+        # Errore nel contenuto del file (TOML o validazione): non riprovare finché non cambia
+        CONFIG_SIGNATURE = signature
+        logger.error(ERROR_MESSAGES["CONFIG_RELOAD_FAILED"].format(str(e)))
+        return False
+    except Exception as e:
+        # Errore transitorio (es. file in aggiornamento): riprova al prossimo controllo
+        logger.error(ERROR_MESSAGES["CONFIG_RELOAD_FAILED"].format(str(e)))
+        return False
+
+    # La chiave SSH può essere in rotazione: in caso di errore riprova al prossimo controllo
+    try:
+        validate_ssh_key(new_settings["SSH_KEY_PATH"])
+    except Exception as e:
+        logger.error(ERROR_MESSAGES["CONFIG_RELOAD_FAILED"].format(str(e)))
+        return False
+
+    old_settings = SETTINGS
+    added_routers = [
+        ip for ip in new_settings["ROUTER_IPS"] if ip not in old_settings["ROUTER_IPS"]
+    ]
+    removed_routers = [
+        ip for ip in old_settings["ROUTER_IPS"] if ip not in new_settings["ROUTER_IPS"]
+    ]
+    changed_settings = [
+        key
+        for key in new_settings
+        if key != "ROUTER_IPS" and new_settings[key] != old_settings[key]
+    ]
+
+    # Ricrea il client S3 solo se sono cambiate endpoint o credenziali
+    s3_keys = ("S3_ENDPOINT_URL", "S3_ACCESS_KEY", "S3_SECRET_KEY")
+    new_s3 = s3
+    if any(key in changed_settings for key in s3_keys):
+        try:
+            new_s3 = create_s3_client(new_settings)
+        except Exception as e:
+            logger.error(ERROR_MESSAGES["CONFIG_RELOAD_FAILED"].format(str(e)))
+            return False
+        logger.debug("Client S3 re-initialized")
+
+    # Tutto è stato validato: applica la nuova configurazione
+    try:
+        apply_settings(new_settings)
+    except OSError as e:
+        logger.error(ERROR_MESSAGES["CONFIG_RELOAD_FAILED"].format(str(e)))
+        return False
+    config = new_config
+    s3 = new_s3
+    CONFIG_SIGNATURE = signature
+
+    if not args.debug:
+        logging.getLogger().setLevel(config["logging"]["level"].upper())
+
+    for ip in added_routers:
+        logger.info(f"{Fore.GREEN}➕ Router added: {ip}{Style.RESET_ALL}")
+    for ip in removed_routers:
+        logger.info(f"{Fore.YELLOW}➖ Router removed: {ip}{Style.RESET_ALL}")
+    for key in changed_settings:
+        if key in ("S3_ACCESS_KEY", "S3_SECRET_KEY"):
+            logger.info(f"- Setting changed: {key}")
+        else:
+            logger.info(f"- Setting changed: {key} = {new_settings[key]}")
+
+    if not added_routers and not removed_routers and not changed_settings:
+        logger.info("Configuration reloaded, no effective changes")
+    else:
+        log_settings()
+
+    return True
+
+
 # Funzione per normalizzare il nome del dispositivo
 def normalize_name(name):
     return name.lower().replace(".", "_").strip()
@@ -568,9 +741,9 @@ def get_backup_statistics(s3_client, bucket_name):
 def main():
     try:
         all_backup_files = []
-        logger.info(f"Starting backup process with {args.jobs} parallel jobs")
+        logger.info(f"Starting backup process with {BACKUP_JOBS} parallel jobs")
 
-        with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        with ThreadPoolExecutor(max_workers=BACKUP_JOBS) as executor:
             future_to_ip = {executor.submit(download_backup, ip, ip): ip for ip in ROUTER_IPS}
 
             for future in as_completed(future_to_ip):
@@ -650,6 +823,8 @@ if __name__ == "__main__":
                         f"{Fore.CYAN}⏰ Next backup scheduled for: {next_run}{Style.RESET_ALL}"
                     )
 
+                # Applica eventuali modifiche alla configurazione tra un backup e l'altro
+                reload_config_if_changed()
                 schedule.run_pending()
                 time.sleep(60)  # Check every minute
             except KeyboardInterrupt: